@@ -1,6 +1,7 @@
 import logging
 from typing import Any, Dict, List, Optional
 
+from gevent.pool import Pool
 from web3 import HTTPProvider, Web3
 from web3.datastructures import MutableAttributeDict
 from web3.exceptions import BadFunctionCallOutput
@@ -20,6 +21,8 @@ log = RotkehlchenLogsAdapter(logger)
 
 AVAX_ADDRESS = '0x9debca6ea3af87bf422cea9ac955618ceb56efb4'
 WEB3_LOGQUERY_BLOCK_RANGE = 250000
+# How many account balance queries to have in flight at the same time
+BALANCE_QUERY_CONCURRENCY = 8
 
 
 class AvalancheManager():
@@ -73,14 +76,16 @@ class AvalancheManager():
     ) -> Dict[ChecksumEthAddress, FVal]:
         """Returns a dict with keys being accounts and balances in AVAX
 
+        The per account queries are network bound so they are dispatched to a
+        pool of greenlets instead of being done one after the other.
+
         May raise:
         - RemoteError if an external service such as Covalent is queried and
           there is a problem with its query.
         """
-        balances = {}
-        for account in accounts:
-            balances[account] = self.get_avax_balance(account)
-        return balances
+        pool = Pool(BALANCE_QUERY_CONCURRENCY)
+        balances_list = pool.map(self.get_avax_balance, accounts)
+        return dict(zip(accounts, balances_list))
 
     def get_block_by_number(self, num: int) -> Dict[str, Any]:
         """Returns the block object corresponding to the given block number
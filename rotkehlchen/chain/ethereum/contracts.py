@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 from eth_typing.abi import Decodable
@@ -8,10 +9,38 @@ from web3._utils.abi import get_abi_output_types
 from rotkehlchen.typing import ChecksumEthAddress
 
 if TYPE_CHECKING:
+    from web3.contract import Contract
+
     from rotkehlchen.chain.ethereum.manager import EthereumManager, NodeName
 
 WEB3 = Web3()
 
+_CONTRACT_CACHE_MAX_ENTRIES = 512
+# Cache of the contract objects bound to the offline WEB3 instance, keyed by
+# address and abi identity. The abi object itself is kept in the value so the
+# identity check can't be fooled by id reuse of a garbage collected abi.
+_CONTRACT_CACHE: 'OrderedDict[Tuple[ChecksumEthAddress, int], Tuple[List, Contract]]' = OrderedDict()  # noqa: E501
+
+
+def offline_contract(address: ChecksumEthAddress, abi: List[Dict[str, Any]]) -> 'Contract':
+    """Returns a contract object bound to the offline WEB3 instance
+
+    Constructing a web3 contract performs full abi normalization which is
+    expensive, so the objects are cached since encoding/decoding happens in
+    per-token loops with the same few abis.
+    """
+    key = (address, id(abi))
+    entry = _CONTRACT_CACHE.get(key)
+    if entry is not None and entry[0] is abi:
+        _CONTRACT_CACHE.move_to_end(key)
+        return entry[1]
+
+    contract = WEB3.eth.contract(address=address, abi=abi)
+    _CONTRACT_CACHE[key] = (abi, contract)
+    if len(_CONTRACT_CACHE) > _CONTRACT_CACHE_MAX_ENTRIES:
+        _CONTRACT_CACHE.popitem(last=False)
+    return contract
+
 
 class EthereumContract(NamedTuple):
     address: ChecksumEthAddress
@@ -53,7 +82,7 @@ class EthereumContract(NamedTuple):
         )
 
     def encode(self, method_name: str, arguments: Optional[List[Any]] = None) -> str:
-        contract = WEB3.eth.contract(address=self.address, abi=self.abi)
+        contract = offline_contract(address=self.address, abi=self.abi)
         return contract.encodeABI(method_name, args=arguments if arguments else [])
 
     def decode(
@@ -62,7 +91,7 @@ class EthereumContract(NamedTuple):
             method_name: str,
             arguments: Optional[List[Any]] = None,
     ) -> Tuple[Any, ...]:
-        contract = WEB3.eth.contract(address=self.address, abi=self.abi)
+        contract = offline_contract(address=self.address, abi=self.abi)
         fn_abi = contract._find_matching_fn_abi(
             fn_identifier=method_name,
             args=arguments if arguments else [],
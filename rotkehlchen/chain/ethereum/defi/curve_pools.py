@@ -1,5 +1,6 @@
 import json
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List
 
@@ -14,8 +15,13 @@ class CurvePool:
     pool_address: ChecksumEthAddress
 
 
+@lru_cache(maxsize=1)
 def get_curve_pools() -> Dict[ChecksumEthAddress, CurvePool]:
-    """Get pools in a CurvePool structure from information file"""
+    """Get pools in a CurvePool structure from information file
+
+    The data file is bundled with the application and never changes at runtime
+    so it's read and parsed only once and the result is cached.
+    """
     pools = {}
     dir_path = Path(__file__).resolve().parent.parent.parent.parent
     with open(dir_path / 'data' / 'curve_pools.json', 'r') as f:
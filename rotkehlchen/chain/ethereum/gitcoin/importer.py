@@ -2,9 +2,12 @@ import csv
 import logging
 import re
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from gevent.pool import Pool
 
 from rotkehlchen.accounting.ledger_actions import GitcoinEventData, LedgerAction, LedgerActionType
+from rotkehlchen.assets.asset import Asset
 from rotkehlchen.assets.utils import get_asset_by_symbol
 from rotkehlchen.chain.ethereum.gitcoin.utils import process_gitcoin_txid
 from rotkehlchen.constants import ZERO
@@ -18,11 +21,17 @@ from rotkehlchen.serialization.deserialize import (
     deserialize_asset_amount,
     deserialize_timestamp_from_date,
 )
-from rotkehlchen.typing import Location, Price
+from rotkehlchen.typing import Location, Price, Timestamp
 
 logger = logging.getLogger(__name__)
 log = RotkehlchenLogsAdapter(logger)
 
+# How many historical price queries to have in flight at the same time. Kept
+# small to respect the rate limits of the upstream price oracles
+PRICE_QUERY_CONCURRENCY = 8
+# How many parsed ledger actions to accumulate before writing them to the DB
+IMPORT_BATCH_SIZE = 1000
+
 
 class GitcoinDataImporter():
 
@@ -30,6 +39,16 @@ class GitcoinDataImporter():
         self.db = db
         self.db_ledger = DBLedgerActions(self.db, self.db.msg_aggregator)
         self.grantid_re = re.compile(r'/grants/(\d+)/.*')
+        # CSVs contain thousands of rows for only a handful of different tokens,
+        # so remember the symbol to asset resolution instead of hitting the
+        # asset DB for every single row
+        self._asset_cache: Dict[str, Optional[Asset]] = {}
+        self._price_cache: Dict[Tuple[Asset, Timestamp], Price] = {}
+
+    def _get_asset_by_symbol(self, symbol: str) -> Optional[Asset]:
+        if symbol not in self._asset_cache:
+            self._asset_cache[symbol] = get_asset_by_symbol(symbol)
+        return self._asset_cache[symbol]
 
     def _consume_grant_entry(self, entry: Dict[str, Any]) -> Optional[LedgerAction]:
         """
@@ -52,18 +71,21 @@ class GitcoinDataImporter():
         )
         usd_value = deserialize_asset_amount(entry['Value In USD'])
 
-        asset = get_asset_by_symbol(entry['token_name'])
+        asset = self._get_asset_by_symbol(entry['token_name'])
         if asset is None:
             raise UnknownAsset(entry['token_name'])
         token_amount = deserialize_asset_amount(entry['token_value'])
 
+        rate = None
         if token_amount == ZERO:  # try to make up for https://github.com/gitcoinco/web/issues/9213
-            price = query_usd_price_zero_if_error(
-                asset=asset,
-                time=timestamp,
-                location=f'Gitcoin CSV entry {entry["txid"]}',
-                msg_aggregator=self.db.msg_aggregator,
-            )
+            price = self._price_cache.get((asset, timestamp))
+            if price is None:
+                price = query_usd_price_zero_if_error(
+                    asset=asset,
+                    time=timestamp,
+                    location=f'Gitcoin CSV entry {entry["txid"]}',
+                    msg_aggregator=self.db.msg_aggregator,
+                )
             if price == ZERO:
                 self.db.msg_aggregator.add_warning(
                     f'Could not process gitcoin grant entry at {entry["date"]} for {asset.symbol} '
@@ -72,6 +94,9 @@ class GitcoinDataImporter():
                 return None
             # calculate the amount from price and value
             token_amount = usd_value / price  # type: ignore
+            # the rate is by construction the price just queried, so don't
+            # derive it back from the amount with another division
+            rate = price
 
         match = self.grantid_re.search(entry['url'])
         if match is None:
@@ -82,7 +107,8 @@ class GitcoinDataImporter():
             return None
 
         grant_id = int(match.group(1))
-        rate = Price(usd_value / token_amount)
+        if rate is None:
+            rate = Price(usd_value / token_amount)
 
         raw_txid = entry['txid']
         tx_type, tx_id = process_gitcoin_txid(key='txid', entry=entry)
@@ -105,10 +131,69 @@ class GitcoinDataImporter():
             ),
         )
 
+    def _prefetch_zero_amount_prices(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Queries concurrently the usd prices of all zero amount grant entries
+
+        Zero amount entries need a historical price query to make up the
+        amount, so find the unique asset/timestamp pairs up front and resolve
+        them over a pool of greenlets instead of serializing one external
+        query per row. Rows that can't be parsed are ignored here and get
+        reported during normal consumption of the entries.
+        """
+        pairs: Dict[Tuple[Asset, Timestamp], str] = {}
+        for entry in rows:
+            try:
+                if entry['Type'] != 'grant':
+                    continue
+                if deserialize_asset_amount(entry['token_value']) != ZERO:
+                    continue
+                timestamp = deserialize_timestamp_from_date(
+                    date=entry['date'],
+                    formatstr='%Y-%m-%dT%H:%M:%S',
+                    location='Gitcoin CSV',
+                    skip_milliseconds=True,
+                )
+                asset = self._get_asset_by_symbol(entry['token_name'])
+                if asset is None:
+                    continue
+                pairs.setdefault((asset, timestamp), entry['txid'])
+            except (DeserializationError, KeyError):
+                continue
+
+        if len(pairs) == 0:
+            return
+
+        def query_price(pair_item: Tuple[Tuple[Asset, Timestamp], str]) -> None:
+            (asset, timestamp), txid = pair_item
+            self._price_cache[(asset, timestamp)] = query_usd_price_zero_if_error(
+                asset=asset,
+                time=timestamp,
+                location=f'Gitcoin CSV entry {txid}',
+                msg_aggregator=self.db.msg_aggregator,
+            )
+
+        pool = Pool(PRICE_QUERY_CONCURRENCY)
+        pool.map(query_price, pairs.items())
+
     def import_gitcoin_csv(self, filepath: Path) -> None:
+        db_actions = self.db_ledger.get_ledger_actions(
+            from_ts=None,
+            to_ts=None,
+            location=Location.BLOCKCHAIN,
+            link='gitcoin',
+        )
+        existing_txids = {x.link for x in db_actions}
+        # First pass over the file to resolve the needed prices concurrently
+        with open(filepath, 'r', encoding='utf-8-sig') as csvfile:
+            self._prefetch_zero_amount_prices(
+                csv.DictReader(csvfile, delimiter=',', quotechar='"'),
+            )
+
+        # Second pass streams the rows and writes the parsed actions to the DB
+        # in batches instead of accumulating everything in memory first
         with open(filepath, 'r', encoding='utf-8-sig') as csvfile:
             data = csv.DictReader(csvfile, delimiter=',', quotechar='"')
-            actions = []
+            batch = []
             for row in data:
                 try:
                     action = self._consume_grant_entry(row)
@@ -132,14 +217,11 @@ class GitcoinDataImporter():
                     )
                     continue
 
-                if action:
-                    actions.append(action)
+                if action and action.link not in existing_txids:
+                    batch.append(action)
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        self.db_ledger.add_ledger_actions(batch)
+                        batch = []
 
-        db_actions = self.db_ledger.get_ledger_actions(
-            from_ts=None,
-            to_ts=None,
-            location=Location.BLOCKCHAIN,
-            link='gitcoin',
-        )
-        existing_txids = [x.link for x in db_actions]
-        self.db_ledger.add_ledger_actions([x for x in actions if x.link not in existing_txids])
+            if len(batch) != 0:
+                self.db_ledger.add_ledger_actions(batch)
@@ -1,7 +1,7 @@
 import json
 import logging
 import random
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union, overload
 from urllib.parse import urlparse
 
@@ -12,22 +12,26 @@ from ens.exceptions import InvalidName
 from ens.main import ENS_MAINNET_ADDR
 from ens.utils import is_none_or_zero_address, normal_name_to_hash, normalize_name
 from eth_typing import BlockNumber, HexStr
+from gevent.pool import Pool
+from requests.adapters import HTTPAdapter
 from typing_extensions import Literal
+from urllib3.util.retry import Retry
 from web3 import HTTPProvider, Web3
 from web3._utils.abi import get_abi_output_types
 from web3._utils.contracts import find_matching_event_abi
 from web3._utils.filters import construct_event_filter_params
+from web3._utils.request import cache_session
 from web3.datastructures import MutableAttributeDict
 from web3.exceptions import BadFunctionCallOutput, BadResponseFormat, TransactionNotFound
 from web3.middleware.exception_retry_request import http_retry_request_middleware
 from web3.types import FilterParams
 
 from rotkehlchen.chain.constants import DEFAULT_EVM_RPC_TIMEOUT
-from rotkehlchen.chain.ethereum.contracts import EthereumContract
+from rotkehlchen.chain.ethereum.contracts import WEB3, EthereumContract, offline_contract
 from rotkehlchen.chain.ethereum.graph import Graph
 from rotkehlchen.chain.ethereum.modules.eth2 import ETH2_DEPOSIT
 from rotkehlchen.chain.ethereum.typing import string_to_ethereum_address
-from rotkehlchen.chain.ethereum.utils import multicall_2
+from rotkehlchen.chain.ethereum.utils import ABI_CODEC, multicall_2
 from rotkehlchen.constants.ethereum import ERC20TOKEN_ABI, ETH_SCAN
 from rotkehlchen.errors import (
     BlockchainQueryError,
@@ -53,7 +57,7 @@ from rotkehlchen.typing import (
     Timestamp,
 )
 from rotkehlchen.user_messages import MessagesAggregator
-from rotkehlchen.utils.misc import from_wei, hex_or_bytes_to_str
+from rotkehlchen.utils.misc import from_wei, hex_or_bytes_to_str, ts_now
 from rotkehlchen.utils.network import request_get_dict
 
 from .typing import NodeName
@@ -84,6 +88,152 @@ def _is_synchronized(current_block: int, latest_block: int) -> Tuple[bool, str]:
 
 
 WEB3_LOGQUERY_BLOCK_RANGE = 250000
+# A new ethereum block appears on average every ~13 seconds so the externally
+# queried chain height can be safely reused for that long
+ETH_HIGHEST_BLOCK_CACHE_SECS = 12
+# Queried historical blocks are immutable so they can be cached. The cache is
+# bounded and only blocks deep enough to not be hit by a reorg are cached.
+BLOCK_CACHE_MAX_ENTRIES = 2048
+BLOCK_CACHE_REORG_PROTECTION = 64
+# For how many seconds to skip a node in the call order after it failed a
+# query. Without this a degraded node gets probed again by every single query
+# and each of those probes pays the full timeout before falling through to
+# the next node.
+NODE_FAILURE_COOLDOWN = 30
+# The network an rpc endpoint is on can't realistically change, but keep a TTL
+# on the cached network id anyway so a user swapping what's behind their own
+# endpoint is eventually noticed. Successful synchronization probes of an
+# endpoint are likewise reused for a short window during reconnects.
+NETWORK_ID_CACHE_SECS = 60
+SYNC_CHECK_CACHE_SECS = 30
+# How many eth_getLogs block ranges to have in flight at the same time. Each
+# query is network bound so overlapping them hides most of the roundtrip time
+WEB3_LOGQUERY_CONCURRENCY = 8
+# Remembers per rpc endpoint the block range size eth_getLogs last managed to
+# serve, so that subsequent queries to the same endpoint don't pay again the
+# wasted roundtrips of oversized queries that need to be split. Successful
+# queries slowly grow the range back towards WEB3_LOGQUERY_BLOCK_RANGE.
+_LAST_LOGQUERY_BLOCK_RANGE: Dict[str, int] = {}
+
+# Connection pool settings for the sessions talking to the web3 nodes. The
+# default urllib3 pool keeps only 10 connections around which is not enough
+# once many concurrent RPC calls fly to the same node (token balance chunks,
+# log query paging etc.) and each extra call pays a new TCP+TLS handshake.
+WEB3_POOL_CONNECTIONS = 20
+WEB3_POOL_MAXSIZE = 64
+
+
+def _create_pooled_session() -> requests.Session:
+    """Creates a requests session with an enlarged keep-alive connection pool
+
+    Also retries transparently at the HTTP layer for transient errors such as
+    429/5xx responses. Since all our JSON-RPC calls are idempotent reads it's
+    fine to also retry POST requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=WEB3_POOL_CONNECTIONS,
+        pool_maxsize=WEB3_POOL_MAXSIZE,
+        max_retries=Retry(
+            # Connection/read retries are already handled by web3's retry
+            # middleware, so only add retries for transient http status codes
+            # here to avoid the two retry layers stacking multiplicatively
+            connect=0,
+            read=0,
+            status=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=None,  # retry all methods, including POST
+        ),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _query_web3_logs_range(
+        web3: Web3,
+        base_filter_args: Dict[str, Any],
+        start_block: int,
+        end_block: int,
+        contract_address: ChecksumEthAddress,
+        event_name: str,
+        argument_filters: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """Queries the logs of a single inclusive block range
+
+    If the node complains that the range contains too many results the range is
+    split in two and each half is queried recursively, until either the query
+    succeeds or the range gets too small, in which case the error is raised.
+
+    base_filter_args holds all the range-invariant filter fields (address,
+    topics) already encoded, so per range only the two block fields are set.
+    """
+    args = {**base_filter_args, 'fromBlock': start_block, 'toBlock': end_block}
+    log.debug(
+        'Querying web3 node for contract event',
+        contract_address=contract_address,
+        event_name=event_name,
+        argument_filters=argument_filters,
+        from_block=start_block,
+        to_block=end_block,
+    )
+    # As seen in https://github.com/rotki/rotki/issues/1787, the json RPC, if it
+    # is infura can throw an error here which we can only parse by catching the  exception
+    try:
+        new_events_web3: List[Dict[str, Any]] = [dict(x) for x in web3.eth.get_logs(args)]
+    except (ValueError, KeyError) as e:
+        if isinstance(e, ValueError):
+            try:
+                decoded_error = json.loads(str(e).replace("'", '"'))
+            except json.JSONDecodeError:
+                # reraise the value error if the error is not json
+                raise e from None
+
+            msg = decoded_error.get('message', '')
+        else:  # temporary hack for key error seen from pokt
+            msg = 'query returned more than 10000 results'
+
+        # errors from: https://infura.io/docs/ethereum/json-rpc/eth-getLogs
+        if msg in ('query returned more than 10000 results', 'query timeout exceeded'):
+            if end_block - start_block < 50:
+                raise  # stop retrying if block range gets too small
+            # repeat the query with each half of the block range
+            middle_block = (start_block + end_block) // 2
+            endpoint = web3.manager.provider.endpoint_uri  # type: ignore
+            half_range = middle_block - start_block
+            if half_range < _LAST_LOGQUERY_BLOCK_RANGE.get(endpoint, WEB3_LOGQUERY_BLOCK_RANGE):
+                _LAST_LOGQUERY_BLOCK_RANGE[endpoint] = half_range
+            return _query_web3_logs_range(
+                web3=web3,
+                base_filter_args=base_filter_args,
+                start_block=start_block,
+                end_block=middle_block,
+                contract_address=contract_address,
+                event_name=event_name,
+                argument_filters=argument_filters,
+            ) + _query_web3_logs_range(
+                web3=web3,
+                base_filter_args=base_filter_args,
+                start_block=middle_block + 1,
+                end_block=end_block,
+                contract_address=contract_address,
+                event_name=event_name,
+                argument_filters=argument_filters,
+            )
+        # else, well we tried .. reraise the error
+        raise e
+
+    # Turn all HexBytes into hex strings
+    for e_idx, event in enumerate(new_events_web3):
+        new_events_web3[e_idx]['blockHash'] = event['blockHash'].hex()
+        new_topics = []
+        for topic in event['topics']:
+            new_topics.append(topic.hex())
+        new_events_web3[e_idx]['topics'] = new_topics
+        new_events_web3[e_idx]['transactionHash'] = event['transactionHash'].hex()
+
+    return new_events_web3
 
 
 def _query_web3_get_logs(
@@ -96,8 +246,6 @@ def _query_web3_get_logs(
         argument_filters: Dict[str, Any],
 ) -> List[Dict[str, Any]]:
     until_block = web3.eth.block_number if to_block == 'latest' else to_block
-    events: List[Dict[str, Any]] = []
-    start_block = from_block
     # we know that in most of its early life the Eth2 contract address returns a
     # a lot of results. So limit the query range to not hit the infura limits every time
     # supress https://lgtm.com/rules/1507386916281/ since it does not apply here
@@ -105,61 +253,52 @@ def _query_web3_get_logs(
         'infura.io' in web3.manager.provider.endpoint_uri and  # type: ignore # noqa: E501 lgtm [py/incomplete-url-substring-sanitization]
         contract_address == ETH2_DEPOSIT.address
     )
-    block_range = initial_block_range = WEB3_LOGQUERY_BLOCK_RANGE
+    endpoint = web3.manager.provider.endpoint_uri  # type: ignore
+    block_range = _LAST_LOGQUERY_BLOCK_RANGE.get(endpoint, WEB3_LOGQUERY_BLOCK_RANGE)
     if infura_eth2_log_query:
-        block_range = initial_block_range = 75000
+        block_range = min(block_range, 75000)
 
+    block_ranges = []
+    start_block = from_block
     while start_block <= until_block:
-        filter_args['fromBlock'] = start_block
         end_block = min(start_block + block_range, until_block)
-        filter_args['toBlock'] = end_block
-        log.debug(
-            'Querying web3 node for contract event',
+        block_ranges.append((start_block, end_block))
+        start_block = end_block + 1
+
+    # Precompute the range-invariant part of the filter once, so each range
+    # query only merges in its two block fields instead of re-copying and
+    # mutating the full filter.
+    base_filter_args = dict(filter_args)
+    base_filter_args.pop('fromBlock', None)
+    base_filter_args.pop('toBlock', None)
+
+    # Since each query is network bound dispatch the block ranges to a pool of
+    # greenlets instead of querying them one after the other. No mutated state
+    # is shared between the greenlets and the results come back in block range
+    # order.
+    pool = Pool(WEB3_LOGQUERY_CONCURRENCY)
+    results = pool.map(
+        lambda block_range_pair: _query_web3_logs_range(
+            web3=web3,
+            base_filter_args=base_filter_args,
+            start_block=block_range_pair[0],
+            end_block=block_range_pair[1],
             contract_address=contract_address,
             event_name=event_name,
             argument_filters=argument_filters,
-            from_block=filter_args['fromBlock'],
-            to_block=filter_args['toBlock'],
-        )
-        # As seen in https://github.com/rotki/rotki/issues/1787, the json RPC, if it
-        # is infura can throw an error here which we can only parse by catching the  exception
-        try:
-            new_events_web3: List[Dict[str, Any]] = [dict(x) for x in web3.eth.get_logs(filter_args)]  # noqa: E501
-        except (ValueError, KeyError) as e:
-            if isinstance(e, ValueError):
-                try:
-                    decoded_error = json.loads(str(e).replace("'", '"'))
-                except json.JSONDecodeError:
-                    # reraise the value error if the error is not json
-                    raise e from None
-
-                msg = decoded_error.get('message', '')
-            else:  # temporary hack for key error seen from pokt
-                msg = 'query returned more than 10000 results'
-
-            # errors from: https://infura.io/docs/ethereum/json-rpc/eth-getLogs
-            if msg in ('query returned more than 10000 results', 'query timeout exceeded'):
-                block_range = block_range // 2
-                if block_range < 50:
-                    raise  # stop retrying if block range gets too small
-                # repeat the query with smaller block range
-                continue
-            # else, well we tried .. reraise the error
-            raise e
-
-        # Turn all HexBytes into hex strings
-        for e_idx, event in enumerate(new_events_web3):
-            new_events_web3[e_idx]['blockHash'] = event['blockHash'].hex()
-            new_topics = []
-            for topic in event['topics']:
-                new_topics.append(topic.hex())
-            new_events_web3[e_idx]['topics'] = new_topics
-            new_events_web3[e_idx]['transactionHash'] = event['transactionHash'].hex()
+        ),
+        block_ranges,
+    )
+    events: List[Dict[str, Any]] = []
+    for new_events in results:
+        events.extend(new_events)
 
-        start_block = end_block + 1
-        events.extend(new_events_web3)
-        # end of the loop, end of 1 query. Reset the block range to max
-        block_range = initial_block_range
+    # The whole query went through, so grow the remembered block range back
+    # towards the default in case it had previously been shrunk. But only if
+    # no range had to be split during this query, which would have shrunk it.
+    no_split_happened = _LAST_LOGQUERY_BLOCK_RANGE.get(endpoint, block_range) >= block_range
+    if block_range < WEB3_LOGQUERY_BLOCK_RANGE and no_split_happened and not infura_eth2_log_query:
+        _LAST_LOGQUERY_BLOCK_RANGE[endpoint] = min(block_range * 2, WEB3_LOGQUERY_BLOCK_RANGE)
 
     return events
 
@@ -218,8 +357,16 @@ class EthereumManager():
         self.etherscan = etherscan
         self.msg_aggregator = msg_aggregator
         self.eth_rpc_timeout = eth_rpc_timeout
+        # Sessions with tuned connection pools per rpc endpoint. Kept here so
+        # that they survive reconnects and keep their warm connections around
+        self.rpc_sessions: Dict[str, requests.Session] = {}
         self.archive_connection = False
         self.queried_archive_connection = False
+        self._highest_block_cache: Optional[Tuple[Timestamp, BlockNumber]] = None
+        self._block_cache: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._node_failure_ts: Dict[NodeName, Timestamp] = {}
+        self._network_id_by_endpoint: Dict[str, Tuple[Timestamp, int]] = {}
+        self._sync_check_ts: Dict[str, Timestamp] = {}
         for node in connect_at_start:
             self.greenlet_manager.spawn_and_track(
                 after_seconds=None,
@@ -308,6 +455,12 @@ class EthereumManager():
             parsed_eth_rpc_endpoint = urlparse(ethrpc_endpoint)
             if not parsed_eth_rpc_endpoint.scheme:
                 ethrpc_endpoint = f"http://{ethrpc_endpoint}"
+            session = self.rpc_sessions.get(ethrpc_endpoint)
+            if session is None:
+                session = _create_pooled_session()
+                self.rpc_sessions[ethrpc_endpoint] = session
+            # Register the session with web3 so make_post_request() uses it
+            cache_session(ethrpc_endpoint, session)
             provider = HTTPProvider(
                 endpoint_uri=ethrpc_endpoint,
                 request_kwargs={'timeout': self.eth_rpc_timeout},
@@ -330,9 +483,20 @@ class EthereumManager():
             # Also make sure we are actually connected to the Ethereum mainnet
             synchronized = True
             msg = ''
+            now = ts_now()
             try:
                 if mainnet_check:
-                    network_id = int(web3.net.version)
+                    # The network an endpoint is on can't change, so reuse a
+                    # recently queried network id instead of asking the node again
+                    network_id_cache = self._network_id_by_endpoint.get(ethrpc_endpoint)
+                    if (
+                            network_id_cache is not None and
+                            now - network_id_cache[0] < NETWORK_ID_CACHE_SECS
+                    ):
+                        network_id = network_id_cache[1]
+                    else:
+                        network_id = int(web3.net.version)
+                        self._network_id_by_endpoint[ethrpc_endpoint] = (now, network_id)
 
                     if network_id != 1:
                         message = (
@@ -343,15 +507,22 @@ class EthereumManager():
                         log.warning(message)
                         return False, message
 
-                    current_block = web3.eth.block_number  # pylint: disable=no-member
-                    try:
-                        latest_block = self.query_eth_highest_block()
-                    except RemoteError:
-                        msg = 'Could not query latest block'
-                        log.warning(msg)
-                        synchronized = False
+                    if now - self._sync_check_ts.get(ethrpc_endpoint, Timestamp(0)) < SYNC_CHECK_CACHE_SECS:  # noqa: E501
+                        # The endpoint checked out as synchronized very recently
+                        # so don't probe the block numbers again
+                        synchronized = True
                     else:
-                        synchronized, msg = _is_synchronized(current_block, latest_block)
+                        current_block = web3.eth.block_number  # pylint: disable=no-member
+                        try:
+                            latest_block = self.query_eth_highest_block()
+                        except RemoteError:
+                            msg = 'Could not query latest block'
+                            log.warning(msg)
+                            synchronized = False
+                        else:
+                            synchronized, msg = _is_synchronized(current_block, latest_block)
+                            if synchronized:
+                                self._sync_check_ts[ethrpc_endpoint] = now
             except ValueError as e:
                 message = (
                     f'Failed to connect to ethereum node {name} at endpoint '
@@ -399,8 +570,20 @@ class EthereumManager():
 
         The first node in the call order that gets a succcesful response returns.
         If none get a result then a remote error is raised
+
+        Nodes that failed a recent query are skipped for a cooldown period so
+        that a degraded node does not make every query pay its timeout. If
+        that would leave no node to try, the cooldown is ignored.
         """
-        for node in call_order:
+        now = ts_now()
+        candidates = [
+            node for node in call_order
+            if now - self._node_failure_ts.get(node, Timestamp(0)) >= NODE_FAILURE_COOLDOWN
+        ]
+        if len(candidates) == 0:
+            candidates = list(call_order)
+
+        for node in candidates:
             web3 = self.web3_mapping.get(node, None)
             if web3 is None and node != NodeName.ETHERSCAN:
                 continue
@@ -416,9 +599,16 @@ class EthereumManager():
                     BadResponseFormat,  # should replace the above KeyError after https://github.com/ethereum/web3.py/pull/2188  # noqa: E501
             ) as e:
                 log.warning(f'Failed to query {node} for {str(method)} due to {str(e)}')
+                if isinstance(e, requests.exceptions.RequestException):
+                    # Only connectivity problems say something about the health
+                    # of the node itself, so only those trigger the cooldown.
+                    # Take a fresh timestamp since a slow timeout may have
+                    # eaten a good chunk of the cooldown period already
+                    self._node_failure_ts[node] = ts_now()
                 # Catch all possible errors here and just try next node call
                 continue
 
+            self._node_failure_ts.pop(node, None)
             return result
 
         # no node in the call order list was succesfully queried
@@ -490,8 +680,18 @@ class EthereumManager():
 
         Returns the highest blockNumber
 
+        The result is cached for a few seconds since the chain height only
+        changes about every 13 seconds and this can get called for every
+        connection attempt.
+
         May Raise RemoteError if querying fails
         """
+        now = ts_now()
+        if (
+                self._highest_block_cache is not None and
+                now - self._highest_block_cache[0] < ETH_HIGHEST_BLOCK_CACHE_SECS
+        ):
+            return self._highest_block_cache[1]
 
         url = 'https://api.blockcypher.com/v1/eth/main'
         log.debug('Querying blockcypher for ETH highest block', url=url)
@@ -509,6 +709,7 @@ class EthereumManager():
             block_number = self.etherscan.get_latest_block_number()
             log.debug('ETH highest block result', block=block_number)
 
+        self._highest_block_cache = (now, BlockNumber(block_number))
         return BlockNumber(block_number)
 
     def get_eth_balance(self, account: ChecksumEthAddress) -> FVal:
@@ -553,11 +754,27 @@ class EthereumManager():
             num: int,
             call_order: Optional[Sequence[NodeName]] = None,
     ) -> Dict[str, Any]:
-        return self.query(
+        block_data = self._block_cache.get(num)
+        if block_data is not None:
+            self._block_cache.move_to_end(num)
+            return block_data
+
+        block_data = self.query(
             method=self._get_block_by_number,
             call_order=call_order if call_order is not None else self.default_call_order(),
             num=num,
         )
+        # Only cache blocks that are deep enough to not be affected by a chain
+        # reorg. The last known chain height is used for the check so that no
+        # extra query is needed here.
+        if (
+                self._highest_block_cache is not None and
+                num <= self._highest_block_cache[1] - BLOCK_CACHE_REORG_PROTECTION
+        ):
+            self._block_cache[num] = block_data
+            if len(self._block_cache) > BLOCK_CACHE_MAX_ENTRIES:
+                self._block_cache.popitem(last=False)
+        return block_data
 
     def _get_block_by_number(self, web3: Optional[Web3], num: int) -> Dict[str, Any]:
         """Returns the block object corresponding to the given block number
@@ -736,8 +953,10 @@ class EthereumManager():
         - RemoteError if there is a problem with
         reaching etherscan or with the returned result
         """
-        web3 = Web3()
-        contract = web3.eth.contract(address=contract_address, abi=abi)
+        # reuse the module level offline Web3 instance since initializing one
+        # per call is not free and only the codec is needed here
+        web3 = WEB3
+        contract = offline_contract(address=contract_address, abi=abi)
         input_data = contract.encodeABI(method_name, args=arguments if arguments else [])
         result = self.etherscan.eth_call(
             to_address=contract_address,
@@ -927,7 +1146,7 @@ class EthereumManager():
         event_abi = find_matching_event_abi(abi=abi, event_name=event_name)
         _, filter_args = construct_event_filter_params(
             event_abi=event_abi,
-            abi_codec=Web3().codec,
+            abi_codec=ABI_CODEC,
             contract_address=contract_address,
             argument_filters=argument_filters,
             fromBlock=from_block,
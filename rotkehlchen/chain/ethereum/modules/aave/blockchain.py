@@ -1,19 +1,22 @@
 import logging
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, cast
 
 from rotkehlchen.accounting.structures import Balance
 from rotkehlchen.assets.asset import Asset, EthereumToken
+from rotkehlchen.chain.ethereum.contracts import EthereumContract
 from rotkehlchen.chain.ethereum.structures import (
     AaveDepositWithdrawalEvent,
     AaveEvent,
     AaveInterestEvent,
 )
+from rotkehlchen.chain.ethereum.utils import multicall_2
 from rotkehlchen.constants.ethereum import (
     AAVE_V1_LENDING_POOL,
     ATOKEN_ABI,
     MAX_BLOCKTIME_CACHE,
     ZERO_ADDRESS,
 )
+from rotkehlchen.errors import RemoteError
 from rotkehlchen.fval import FVal
 from rotkehlchen.globaldb.handler import GlobalDBHandler
 from rotkehlchen.history.price import query_usd_price_zero_if_error
@@ -129,9 +132,10 @@ class AaveBlockchainInquirer(AaveInquirer):
 
         # now for each atoken get all mint events and pass then to profit calculation
         tokens = GlobalDBHandler().get_ethereum_tokens(protocol='aave')
+        atoken_balances = self._query_atoken_balances(user_address=user_address, tokens=tokens)
         total_address_events = []
         total_earned_map: Dict[Asset, Balance] = {}
-        for token in tokens:
+        for token_idx, token in enumerate(tokens):
             log.debug(
                 f'Querying aave events for {user_address} and token '
                 f'{token.identifier} with query_events={query_events}',
@@ -161,18 +165,7 @@ class AaveBlockchainInquirer(AaveInquirer):
             # accrued interest has not been yet paid out
             # TODO: ARCHIVE if to_block is not latest here we should get the balance
             # from the old block. Means using archive node
-            balance = self.ethereum.call_contract(
-                contract_address=token.ethereum_address,
-                abi=ATOKEN_ABI,
-                method_name='balanceOf',
-                arguments=[user_address],
-            )
-            principal_balance = self.ethereum.call_contract(
-                contract_address=token.ethereum_address,
-                abi=ATOKEN_ABI,
-                method_name='principalBalanceOf',
-                arguments=[user_address],
-            )
+            balance, principal_balance = atoken_balances[token_idx]
 
             if len(events) == 0 and balance == 0 and principal_balance == 0:
                 # Nothing for this aToken for this address
@@ -206,6 +199,66 @@ class AaveBlockchainInquirer(AaveInquirer):
             total_earned_liquidations={},
         )
 
+    def _query_atoken_balances(
+            self,
+            user_address: ChecksumEthAddress,
+            tokens: List[EthereumToken],
+    ) -> List[Tuple[int, int]]:
+        """Queries the balance and principal balance of all atokens for an address
+
+        Batches the balanceOf/principalBalanceOf calls of all atokens in a single
+        multicall query instead of doing 2 eth_calls per atoken. If the multicall
+        fails fall back to querying each atoken individually.
+
+        May raise:
+        - RemoteError if an external service is queried and there is a problem
+        with its query
+        """
+        contracts = [
+            EthereumContract(address=token.ethereum_address, abi=ATOKEN_ABI, deployed_block=0)
+            for token in tokens
+        ]
+        calls = []
+        for contract in contracts:
+            calls.append((contract.address, contract.encode(method_name='balanceOf', arguments=[user_address])))  # noqa: E501
+            calls.append((contract.address, contract.encode(method_name='principalBalanceOf', arguments=[user_address])))  # noqa: E501
+
+        try:
+            output = multicall_2(
+                ethereum=self.ethereum,
+                require_success=True,
+                calls=calls,
+            )
+        except RemoteError:
+            # Fall back to querying each atoken with individual calls
+            balances = []
+            for token in tokens:
+                balance = self.ethereum.call_contract(
+                    contract_address=token.ethereum_address,
+                    abi=ATOKEN_ABI,
+                    method_name='balanceOf',
+                    arguments=[user_address],
+                )
+                principal_balance = self.ethereum.call_contract(
+                    contract_address=token.ethereum_address,
+                    abi=ATOKEN_ABI,
+                    method_name='principalBalanceOf',
+                    arguments=[user_address],
+                )
+                balances.append((balance, principal_balance))
+            return balances
+
+        balances = []
+        for idx in range(len(contracts)):
+            # both methods return a single uint256, so decode the 32-byte
+            # result directly instead of going through the abi codec.
+            # int.from_bytes is a C implementation over the raw bytes
+            balance = int.from_bytes(output[2 * idx][1], 'big')  # pylint: disable=E1136
+            principal_balance = int.from_bytes(output[2 * idx + 1][1], 'big')  # pylint: disable=E1136  # noqa: E501
+            balances.append((balance, principal_balance))
+
+        return balances
+
     def get_events_for_atoken_and_address(
             self,
             user_address: ChecksumEthAddress,
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
 from eth_utils import to_bytes, to_checksum_address
@@ -46,11 +47,18 @@ ENS_RESOLVER_ABI_MULTICHAIN_ADDRESS = [
 ]
 
 
+@lru_cache(maxsize=64)
+def _decimals_divisor(token_decimals: int) -> FVal:
+    """The power of ten to divide a raw token amount by. Memoized since it's
+    recomputed for every entry of the token balance query loops otherwise"""
+    return FVal(10) ** FVal(token_decimals)
+
+
 def token_normalized_value_decimals(token_amount: int, token_decimals: Optional[int]) -> FVal:
     if token_decimals is None:  # if somehow no info on decimals ends up here assume 18
         token_decimals = 18
 
-    return token_amount / (FVal(10) ** FVal(token_decimals))
+    return token_amount / _decimals_divisor(token_decimals)
 
 
 def token_normalized_value(
@@ -124,9 +124,13 @@ class Etherscan(ExternalServiceWithApiKey):
             try:
                 response = self.session.get(query_str, timeout=timeout if timeout else DEFAULT_TIMEOUT_TUPLE)  # noqa: E501
             except requests.exceptions.RequestException as e:
-                if 'Max retries exceeded with url' in str(e):
+                transient_error = (
+                    isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)) or  # noqa: E501
+                    'Max retries exceeded with url' in str(e)
+                )
+                if transient_error:
                     log.debug(
-                        f'Got max retries exceeded from etherscan. Will '
+                        f'Got transient error {str(e)} from etherscan. Will '
                         f'backoff for {backoff} seconds.',
                     )
                     gevent.sleep(backoff)
@@ -141,6 +145,23 @@ class Etherscan(ExternalServiceWithApiKey):
                 raise RemoteError(f'Etherscan API request failed due to {str(e)}') from e
 
             if response.status_code != 200:
+                if response.status_code in (429, 502, 503, 504):
+                    # too many requests or a temporary server side problem.
+                    # Retry with backoff instead of failing the whole query run
+                    log.debug(
+                        f'Got HTTP status {response.status_code} from etherscan. Will '
+                        f'backoff for {backoff} seconds.',
+                    )
+                    gevent.sleep(backoff)
+                    backoff = backoff * 2
+                    if backoff >= backoff_limit:
+                        raise RemoteError(
+                            f'Etherscan API request {response.url} kept failing '
+                            f'with HTTP status code {response.status_code} even '
+                            f'after we incrementally backed off',
+                        )
+                    continue
+
                 raise RemoteError(
                     f'Etherscan API request {response.url} failed '
                     f'with HTTP status code {response.status_code} and text '
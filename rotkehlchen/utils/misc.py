@@ -294,8 +294,12 @@ def hex_or_bytes_to_address(value: Union[bytes, str]) -> ChecksumEthAddress:
     return ChecksumEthAddress(to_checksum_address('0x' + hexstr[26:]))
 
 
+# Precomputed since address_to_bytes32() gets called in per-event loops
+_BYTES32_ADDRESS_PAD = '0x' + 24 * '0'
+
+
 def address_to_bytes32(address: ChecksumEthAddress) -> str:
-    return '0x' + 24 * '0' + address.lower()[2:]
+    return _BYTES32_ADDRESS_PAD + address.lower()[2:]
 
 
 T = TypeVar('T')